@@ -22,9 +22,19 @@ else:
 FORECAST_ENDPOINT = f"{XWEATHER_BASE_URL}/forecasts"
 OBSERVATIONS_ENDPOINT = f"{XWEATHER_BASE_URL}/observations"
 
+# Pre-bound URL builders for the path-style location endpoints
+OBSERVATIONS_URL_FMT = (OBSERVATIONS_ENDPOINT + "/{lat},{lon}").format_map
+FORECAST_URL_FMT = (FORECAST_ENDPOINT + "/{lat},{lon}").format_map
+
 # Cache settings
 CACHE_TTL = 300  # 5 minutes in seconds
 MAX_CACHE_SIZE = 1000
+CACHE_COORD_DECIMALS = 4  # ~11 m; nearby lookups share a cache entry
+HTTP_CACHE_NAME = 'xweather_cache'  # on-disk response cache (needs requests-cache)
+
+# HTTP connection pool sizing for concurrent Xweather requests
+HTTP_POOL_CONNECTIONS = 32
+HTTP_POOL_MAXSIZE = 32
 
 # Map settings
 DEFAULT_ZOOM = 10
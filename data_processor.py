@@ -4,12 +4,133 @@ Data processing utilities for hyperlocal weather data.
 import pandas as pd
 import geopandas as gpd
 import numpy as np
-from typing import Dict, List, Optional, Tuple
-from shapely.geometry import Point
+from typing import Dict, List, Optional, Set, Tuple
 import logging
+from types import MappingProxyType
+
+try:
+    import numba as nb
+except ImportError:  # numba is an optional speedup
+    nb = None
 
 logger = logging.getLogger(__name__)
 
+# Shared, read-only weather description to icon mapping
+WEATHER_ICONS = MappingProxyType({
+    'clear': '☀️',
+    'sunny': '☀️',
+    'partly cloudy': '⛅',
+    'cloudy': '☁️',
+    'overcast': '☁️',
+    'rain': '🌧️',
+    'showers': '🌦️',
+    'thunderstorm': '⛈️',
+    'snow': '❄️',
+    'fog': '🌫️',
+    'haze': '🌫️'
+})
+DEFAULT_WEATHER_ICON = '🌤️'
+_ICON_SERIES = pd.Series(dict(WEATHER_ICONS), name='weather_icon')
+
+# Measurement columns coerced to numeric during cleaning
+NUMERIC_COLUMNS = ('temperature', 'temperature_max', 'temperature_min',
+                   'humidity', 'pressure', 'wind_speed')
+
+# Temperature category bins (upper edges, inclusive) and categorical dtypes
+TEMP_CATEGORY_BINS = np.array([32, 50, 70, 90], dtype=np.float64)
+TEMP_CATEGORY_DTYPE = pd.CategoricalDtype(['Freezing', 'Cold', 'Cool', 'Warm', 'Hot'], ordered=True)
+TEMP_ZONE_DTYPE = pd.CategoricalDtype(['Cold Zone', 'Moderate Zone', 'Warm Zone'], ordered=True)
+
+# Observation stages available to prepare_for_mapping
+MAPPING_FEATURES = frozenset({'observations', 'grid', 'zones', 'gradients'})
+
+# Below this many points the JIT dispatch overhead outweighs the numpy path
+NUMBA_MIN_POINTS = 1000
+
+if nb is not None:
+    # NaN/inf handling stays strict so missing temperatures are still skipped
+    @nb.njit(parallel=True, fastmath={'contract', 'arcp', 'reassoc'}, cache=True)
+    def _gradient_kernel(temps, indices, distances, out):
+        """Fill out[i] with the temperature gradient to point i's neighbors."""
+        n, k = indices.shape
+        for i in nb.prange(n):
+            temp_sum = 0.0
+            count = 0
+            dist_sum = 0.0
+            for j in range(k):
+                t = temps[indices[i, j]]
+                if not np.isnan(t):
+                    temp_sum += t
+                    count += 1
+                dist_sum += distances[i, j]
+            mean_distance = dist_sum / k
+            if mean_distance <= 0:
+                out[i] = 0.0
+            elif count == 0:
+                out[i] = np.nan
+            else:
+                out[i] = (temps[i] - temp_sum / count) / mean_distance
+
+def _drop_self(distances: np.ndarray, indices: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Remove each point from its own neighbor list by index.
+    
+    Args:
+        distances: (n, k) neighbor distances, nearest first
+        indices: (n, k) neighbor indices, including the point itself
+        
+    Returns:
+        Tuple of (distances, indices) arrays of shape (n, k - 1)
+    """
+    n, k = indices.shape
+    keep = indices != np.arange(n)[:, None]
+    # Rows crowded out by more than k coincident points do not list
+    # themselves at all; drop their farthest candidate instead
+    keep[keep.all(axis=1), -1] = False
+    return distances[keep].reshape(n, k - 1), indices[keep].reshape(n, k - 1)
+
+def _nearest_neighbors_blocked(coords: np.ndarray, k: int,
+                               block_size: int = 256) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Find the k nearest neighbors of every point without an n x n matrix.
+    
+    Squared distances are computed one tile of rows at a time using the
+    ||x||^2 + ||y||^2 - 2xy identity, so each tile is a single matrix product
+    and only k candidates per row are kept.
+    
+    Args:
+        coords: (n, 2) array of coordinates
+        k: Number of neighbors to return, including the point itself
+        block_size: Number of rows per tile
+        
+    Returns:
+        Tuple of (distances, indices) arrays of shape (n, k), nearest first
+        with each point itself in column 0
+    """
+    n = len(coords)
+    # Centering keeps the identity well conditioned for small separations
+    centered = coords - coords.mean(axis=0)
+    sq_norms = (centered * centered).sum(axis=1)
+    indices = np.empty((n, k), dtype=np.intp)
+    
+    for start in range(0, n, block_size):
+        stop = min(start + block_size, n)
+        block = centered[start:stop]
+        d2 = sq_norms[start:stop, None] + sq_norms[None, :] - 2.0 * (block @ centered.T)
+        
+        # Pin each point to the front of its own row
+        rows = np.arange(stop - start)
+        d2[rows, rows + start] = -np.inf
+        
+        candidates = np.argpartition(d2, k - 1, axis=1)[:, :k]
+        order = np.take_along_axis(d2, candidates, axis=1).argsort(axis=1)
+        indices[start:stop] = np.take_along_axis(candidates, order, axis=1)
+    
+    # Exact distances for the selected pairs only
+    distances = np.sqrt(((coords[indices] - coords[:, None, :]) ** 2).sum(axis=2))
+    
+    return distances, indices
+
 class WeatherDataProcessor:
     """
     Process and structure weather data for geospatial visualization.
@@ -17,19 +138,7 @@ class WeatherDataProcessor:
     
     def __init__(self):
         """Initialize the data processor."""
-        self.weather_icons = {
-            'clear': '☀️',
-            'sunny': '☀️',
-            'partly cloudy': '⛅',
-            'cloudy': '☁️',
-            'overcast': '☁️',
-            'rain': '🌧️',
-            'showers': '🌦️',
-            'thunderstorm': '⛈️',
-            'snow': '❄️',
-            'fog': '🌫️',
-            'haze': '🌫️'
-        }
+        self.weather_icons = WEATHER_ICONS
     
     def clean_weather_data(self, df: pd.DataFrame) -> pd.DataFrame:
         """
@@ -47,47 +156,41 @@ class WeatherDataProcessor:
         # Remove rows with missing coordinates
         df = df.dropna(subset=['latitude', 'longitude'])
         
-        # Convert temperature to numeric, handling missing values
-        if 'temperature' in df.columns:
-            df['temperature'] = pd.to_numeric(df['temperature'], errors='coerce')
-        
-        if 'temperature_max' in df.columns:
-            df['temperature_max'] = pd.to_numeric(df['temperature_max'], errors='coerce')
-        
-        if 'temperature_min' in df.columns:
-            df['temperature_min'] = pd.to_numeric(df['temperature_min'], errors='coerce')
-        
-        # Convert humidity to numeric
-        if 'humidity' in df.columns:
-            df['humidity'] = pd.to_numeric(df['humidity'], errors='coerce')
+        # Convert measurement columns to numeric, handling missing values.
+        # float32 is plenty for these readings and halves the bytes scanned
+        # downstream; latitude/longitude stay float64 for map precision.
+        for col in NUMERIC_COLUMNS:
+            if col in df.columns:
+                df[col] = pd.to_numeric(df[col], errors='coerce').astype(np.float32)
         
-        # Convert pressure to numeric
-        if 'pressure' in df.columns:
-            df['pressure'] = pd.to_numeric(df['pressure'], errors='coerce')
-        
-        # Convert wind speed to numeric
-        if 'wind_speed' in df.columns:
-            df['wind_speed'] = pd.to_numeric(df['wind_speed'], errors='coerce')
-        
-        # Standardize weather descriptions
+        # Standardize weather descriptions on the unique values only
         if 'weather' in df.columns:
-            df['weather'] = df['weather'].str.lower().str.strip()
-            df['weather_icon'] = df['weather'].map(self.weather_icons).fillna('🌤️')
+            weather = df['weather'].astype('category')
+            codes = weather.cat.codes.to_numpy()
+            categories = weather.cat.categories.astype(object).str.lower().str.strip()
+            
+            # Trailing slot catches missing values (code -1)
+            labels = np.append(categories.to_numpy(dtype=object), np.nan)
+            icons = np.append(
+                categories.map(_ICON_SERIES).fillna(DEFAULT_WEATHER_ICON).to_numpy(dtype=object),
+                DEFAULT_WEATHER_ICON
+            )
+            df['weather'] = labels[codes]
+            df['weather_icon'] = icons[codes]
         
         # Add temperature categories
         if 'temperature' in df.columns:
-            df['temp_category'] = pd.cut(
-                df['temperature'], 
-                bins=[-np.inf, 32, 50, 70, 90, np.inf],
-                labels=['Freezing', 'Cold', 'Cool', 'Warm', 'Hot']
-            )
+            temps = df['temperature'].to_numpy()
+            codes = np.digitize(temps, TEMP_CATEGORY_BINS, right=True)
+            codes[np.isnan(temps)] = -1
+            df['temp_category'] = pd.Categorical.from_codes(codes, dtype=TEMP_CATEGORY_DTYPE)
         
         return df
     
     def create_heatmap_data(self, df: pd.DataFrame, 
                           lat_col: str = 'latitude', 
                           lon_col: str = 'longitude',
-                          value_col: str = 'temperature') -> List[Tuple[float, float, float]]:
+                          value_col: str = 'temperature') -> List[List[float]]:
         """
         Create heatmap data for visualization.
         
@@ -98,16 +201,15 @@ class WeatherDataProcessor:
             value_col: Value column for heatmap intensity
             
         Returns:
-            List of (lat, lon, value) tuples
+            List of [lat, lon, value] points
         """
         if df.empty:
             return []
         
-        # Remove rows with missing values
+        # Remove rows with missing values and extract all points in one pass
         heatmap_data = df[[lat_col, lon_col, value_col]].dropna()
         
-        return [(row[lat_col], row[lon_col], row[value_col]) 
-                for _, row in heatmap_data.iterrows()]
+        return heatmap_data.to_numpy(dtype=np.float64).tolist()
     
     def aggregate_by_grid(self, df: pd.DataFrame, grid_size: float = 0.01) -> gpd.GeoDataFrame:
         """
@@ -123,27 +225,37 @@ class WeatherDataProcessor:
         if df.empty:
             return gpd.GeoDataFrame()
         
-        # Create grid cells
-        df['grid_lat'] = (df['latitude'] // grid_size) * grid_size
-        df['grid_lon'] = (df['longitude'] // grid_size) * grid_size
-        
-        # Aggregate by grid
-        agg_data = df.groupby(['grid_lat', 'grid_lon']).agg({
-            'temperature': ['mean', 'min', 'max', 'count'],
-            'humidity': 'mean',
-            'pressure': 'mean',
-            'wind_speed': 'mean'
-        }).reset_index()
+        # Encode each grid cell as a single dense integer key
+        lat_idx = np.floor_divide(df['latitude'].to_numpy(dtype=np.float64), grid_size).astype(np.int64)
+        lon_idx = np.floor_divide(df['longitude'].to_numpy(dtype=np.float64), grid_size).astype(np.int64)
+        lat_min = lat_idx.min()
+        lon_min = lon_idx.min()
+        n_lon = lon_idx.max() - lon_min + 1
+        cell_ids = (lat_idx - lat_min) * n_lon + (lon_idx - lon_min)
+        
+        # Aggregate by grid; the key is a frame column so as_index=False keeps it
+        agg_data = df[['temperature', 'humidity', 'pressure', 'wind_speed']].assign(
+            cell_id=cell_ids
+        ).groupby('cell_id', as_index=False, sort=False).agg(
+            temp_mean=('temperature', 'mean'),
+            temp_min=('temperature', 'min'),
+            temp_max=('temperature', 'max'),
+            station_count=('temperature', 'count'),
+            humidity_mean=('humidity', 'mean'),
+            pressure_mean=('pressure', 'mean'),
+            wind_speed_mean=('wind_speed', 'mean')
+        )
         
-        # Flatten column names
-        agg_data.columns = ['grid_lat', 'grid_lon', 'temp_mean', 'temp_min', 
-                          'temp_max', 'station_count', 'humidity_mean', 
-                          'pressure_mean', 'wind_speed_mean']
+        # Recover cell coordinates from the integer keys
+        cell_ids = agg_data.pop('cell_id').to_numpy()
+        agg_data.insert(0, 'grid_lon', (cell_ids % n_lon + lon_min) * grid_size)
+        agg_data.insert(0, 'grid_lat', (cell_ids // n_lon + lat_min) * grid_size)
+        agg_data['station_count'] = pd.to_numeric(agg_data['station_count'], downcast='integer')
         
         # Create geometry for grid cells
-        agg_data['geometry'] = [
-            Point(lon, lat) for lat, lon in zip(agg_data['grid_lat'], agg_data['grid_lon'])
-        ]
+        agg_data['geometry'] = gpd.points_from_xy(
+            agg_data['grid_lon'].to_numpy(), agg_data['grid_lat'].to_numpy()
+        )
         
         # Convert to GeoDataFrame
         gdf = gpd.GeoDataFrame(agg_data, crs='EPSG:4326')
@@ -158,36 +270,46 @@ class WeatherDataProcessor:
             df: Weather DataFrame
             
         Returns:
-            DataFrame with gradient calculations
+            Copy of the DataFrame with a temperature_gradient column; the
+            input is not modified
         """
-        if df.empty or len(df) < 2:
+        # Only temperature gradients are computed, so skip the neighbor
+        # search entirely when there is nothing to compare
+        if df.empty or len(df) < 2 or 'temperature' not in df.columns:
             return df
         
-        # Calculate distances between points
-        from scipy.spatial.distance import pdist, squareform
-        from scipy.spatial.distance import cdist
+        temps = df['temperature'].to_numpy(dtype=np.float64)
         
-        coords = df[['latitude', 'longitude']].values
-        distances = cdist(coords, coords, metric='euclidean')
+        # Find nearest neighbors without materializing a full distance matrix
+        coords = df[['latitude', 'longitude']].to_numpy(dtype=np.float64)
+        k = min(4, len(df))  # Self plus up to 3 nearest
+        
+        try:
+            from scipy.spatial import cKDTree
+        except ImportError:
+            distances, indices = _nearest_neighbors_blocked(coords, k)
+        else:
+            distances, indices = cKDTree(coords).query(coords, k=k)
+        
+        # Drop each point itself; with duplicate coordinates it need not be in column 0
+        distances, indices = _drop_self(distances, indices)
         
         # Calculate temperature gradients
-        if 'temperature' in df.columns:
-            temp_gradients = []
-            for i in range(len(df)):
-                # Find nearest neighbors
-                nearest_indices = np.argsort(distances[i])[1:4]  # Skip self, get 3 nearest
-                
-                if len(nearest_indices) > 0:
-                    temp_diff = df.iloc[i]['temperature'] - df.iloc[nearest_indices]['temperature'].mean()
-                    distance = distances[i][nearest_indices].mean()
-                    gradient = temp_diff / distance if distance > 0 else 0
-                    temp_gradients.append(gradient)
-                else:
-                    temp_gradients.append(0)
+        if nb is not None and len(df) >= NUMBA_MIN_POINTS:
+            gradients = np.empty(len(df), dtype=np.float64)
+            _gradient_kernel(temps, indices, distances, gradients)
+        else:
+            neighbor_temps = temps[indices]
             
-            df['temperature_gradient'] = temp_gradients
-        
-        return df
+            # Mean of neighbor temperatures, ignoring missing values
+            valid = ~np.isnan(neighbor_temps)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                neighbor_mean = np.where(valid, neighbor_temps, 0.0).sum(axis=1) / valid.sum(axis=1)
+                mean_distance = distances.mean(axis=1)
+                gradients = np.where(mean_distance > 0, (temps - neighbor_mean) / mean_distance, 0.0)
+        
+        # Return a new frame so the shared cleaned observations stay untouched
+        return df.assign(temperature_gradient=gradients)
     
     def create_weather_zones(self, df: pd.DataFrame, 
                            temp_threshold: float = 5.0) -> gpd.GeoDataFrame:
@@ -205,31 +327,37 @@ class WeatherDataProcessor:
             return gpd.GeoDataFrame()
         
         # Calculate temperature statistics
-        temp_mean = df['temperature'].mean()
-        temp_std = df['temperature'].std()
-        
-        # Create temperature zones
-        df['temp_zone'] = pd.cut(
-            df['temperature'],
-            bins=[-np.inf, temp_mean - temp_std, temp_mean + temp_std, np.inf],
-            labels=['Cold Zone', 'Moderate Zone', 'Warm Zone']
-        )
-        
-        # Group by temperature zone
-        zones = df.groupby('temp_zone', observed=True).agg({
-            'latitude': ['mean', 'count'],
-            'longitude': 'mean',
-            'temperature': ['mean', 'min', 'max'],
-            'humidity': 'mean',
-            'pressure': 'mean'
-        }).reset_index()
-        
-        # Flatten column names
-        zones.columns = ['zone', 'lat_mean', 'station_count', 'lon_mean', 
-                        'temp_mean', 'temp_min', 'temp_max', 'humidity_mean', 'pressure_mean']
+        temp_mean, temp_std = df['temperature'].agg(['mean', 'std'])
+        
+        # Create temperature zones; bins are right-inclusive like pd.cut
+        temps = df['temperature'].to_numpy()
+        if temp_std > 0:
+            codes = np.searchsorted(np.array([temp_mean - temp_std, temp_mean + temp_std]), temps)
+        else:
+            # No spread (all equal, or a single station gives NaN): nothing is colder or warmer
+            codes = np.full(len(temps), TEMP_ZONE_DTYPE.categories.get_loc('Moderate Zone'))
+        codes[np.isnan(temps)] = -1
+        temp_zone = pd.Categorical.from_codes(codes, dtype=TEMP_ZONE_DTYPE)
+        
+        # Group by temperature zone on a copy, so the input frame is untouched;
+        # the key must be a column for as_index=False to keep it
+        zone_cols = df[['latitude', 'longitude', 'temperature', 'humidity', 'pressure']]
+        zones = zone_cols.assign(temp_zone=temp_zone).groupby(
+            'temp_zone', as_index=False, sort=False, observed=True
+        ).agg(
+            lat_mean=('latitude', 'mean'),
+            station_count=('latitude', 'count'),
+            lon_mean=('longitude', 'mean'),
+            temp_mean=('temperature', 'mean'),
+            temp_min=('temperature', 'min'),
+            temp_max=('temperature', 'max'),
+            humidity_mean=('humidity', 'mean'),
+            pressure_mean=('pressure', 'mean')
+        ).rename(columns={'temp_zone': 'zone'})
+        zones['station_count'] = pd.to_numeric(zones['station_count'], downcast='integer')
         
         # Create geometry
-        zones['geometry'] = [Point(lon, lat) for lat, lon in zip(zones['lat_mean'], zones['lon_mean'])]
+        zones['geometry'] = gpd.points_from_xy(zones['lon_mean'].to_numpy(), zones['lat_mean'].to_numpy())
         
         # Convert to GeoDataFrame
         zones_gdf = gpd.GeoDataFrame(zones, crs='EPSG:4326')
@@ -237,32 +365,46 @@ class WeatherDataProcessor:
         return zones_gdf
     
     def prepare_for_mapping(self, observations: pd.DataFrame, 
-                          forecast: pd.DataFrame = None) -> Dict[str, gpd.GeoDataFrame]:
+                          forecast: pd.DataFrame = None,
+                          features: Optional[Set[str]] = None) -> Dict[str, gpd.GeoDataFrame]:
         """
         Prepare weather data for mapping visualization.
         
         Args:
             observations: Observations DataFrame
             forecast: Forecast DataFrame (optional)
+            features: Observation stages to run, any of 'observations', 'grid',
+                'zones' and 'gradients'. Defaults to all of them.
             
         Returns:
             Dictionary with processed data for mapping
         """
+        if features is None:
+            features = MAPPING_FEATURES
+        
+        unknown = set(features) - MAPPING_FEATURES
+        if unknown:
+            raise ValueError(f"Unknown mapping features: {', '.join(sorted(unknown))}")
+        
         result = {}
         
         # Process observations
-        if not observations.empty:
+        if not observations.empty and features:
             obs_clean = self.clean_weather_data(observations)
-            result['observations'] = obs_clean
+            if 'observations' in features:
+                result['observations'] = obs_clean
             
             # Create aggregated grid data
-            result['grid_data'] = self.aggregate_by_grid(obs_clean)
+            if 'grid' in features:
+                result['grid_data'] = self.aggregate_by_grid(obs_clean)
             
             # Create weather zones
-            result['weather_zones'] = self.create_weather_zones(obs_clean)
+            if 'zones' in features:
+                result['weather_zones'] = self.create_weather_zones(obs_clean)
             
             # Calculate gradients
-            result['gradients'] = self.calculate_weather_gradients(obs_clean)
+            if 'gradients' in features:
+                result['gradients'] = self.calculate_weather_gradients(obs_clean)
         
         # Process forecast
         if forecast is not None and not forecast.empty:
@@ -4,7 +4,8 @@ Comprehensive demo of the hyperlocal weather map application.
 import os
 import sys
 import logging
-from main import HyperlocalWeatherApp
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from main import HyperlocalWeatherApp, MAP_FEATURES
 
 # Set up logging
 logging.basicConfig(
@@ -31,46 +32,58 @@ def run_comprehensive_demo():
             (41.8781, -87.6298, "Chicago")
         ]
         
-        for lat, lon, name in demo_locations:
-            print(f"\n📍 Processing {name} ({lat}, {lon})")
-            print("-" * 30)
+        # Resolve output paths up front so the loop only fetches and renders
+        jobs = [
+            (lat, lon, name, f"demo_{name.replace(' ', '_').lower()}_weather.html")
+            for lat, lon, name in demo_locations
+        ]
+        
+        # Fetch all locations concurrently; the requests are network-bound
+        with ThreadPoolExecutor(max_workers=len(jobs)) as executor:
+            futures = {
+                executor.submit(app.get_weather_data, lat, lon, radius=30,
+                                include_forecast=True, features=MAP_FEATURES): (lat, lon, name, output_file)
+                for lat, lon, name, output_file in jobs
+            }
             
-            try:
-                # Get weather data
-                logger.info(f"Fetching weather data for {name}")
-                weather_data = app.get_weather_data(lat, lon, radius=30, include_forecast=True)
-                
-                # Create map
-                output_file = f"demo_{name.replace(' ', '_').lower()}_weather.html"
-                map_path = app.create_weather_map(
-                    weather_data,
-                    output_file=output_file,
-                    tile_layer='satellite'
-                )
-                
-                print(f"✅ Map created: {map_path}")
-                print(f"🌐 Map opened in browser: {map_path}")
-                
-                # Print data summary
-                if 'observations' in weather_data and not weather_data['observations'].empty:
-                    obs = weather_data['observations']
-                    print(f"📊 Observations: {len(obs)} stations")
-                    print(f"🌡️ Temperature range: {obs['temperature'].min():.1f}°F - {obs['temperature'].max():.1f}°F")
-                    print(f"💧 Humidity range: {obs['humidity'].min():.1f}% - {obs['humidity'].max():.1f}%")
-                
-                if 'forecast' in weather_data and not weather_data['forecast'].empty:
-                    forecast = weather_data['forecast']
-                    print(f"🔮 Forecast periods: {len(forecast)}")
+            for future in as_completed(futures):
+                lat, lon, name, output_file = futures[future]
+                print(f"\n📍 Processing {name} ({lat}, {lon})")
+                print("-" * 30)
                 
-            except Exception as e:
-                logger.error(f"Error processing {name}: {e}")
-                print(f"❌ Failed to process {name}")
+                try:
+                    # Get weather data
+                    weather_data = future.result()
+                    
+                    # Create map
+                    map_path = app.create_weather_map(
+                        weather_data,
+                        output_file=output_file,
+                        tile_layer='satellite'
+                    )
+                    
+                    print(f"✅ Map created: {map_path}")
+                    print(f"🌐 Map opened in browser: {map_path}")
+                    
+                    # Print data summary
+                    if 'observations' in weather_data and not weather_data['observations'].empty:
+                        obs = weather_data['observations']
+                        print(f"📊 Observations: {len(obs)} stations")
+                        print(f"🌡️ Temperature range: {obs['temperature'].min():.1f}°F - {obs['temperature'].max():.1f}°F")
+                        print(f"💧 Humidity range: {obs['humidity'].min():.1f}% - {obs['humidity'].max():.1f}%")
+                    
+                    if 'forecast' in weather_data and not weather_data['forecast'].empty:
+                        forecast = weather_data['forecast']
+                        print(f"🔮 Forecast periods: {len(forecast)}")
+                    
+                except Exception as e:
+                    logger.error(f"Error processing {name}: {e}")
+                    print(f"❌ Failed to process {name}")
         
         print("\n🎉 Demo completed successfully!")
         print("\n📁 Generated files:")
-        print("   - demo_new_york_city_weather.html")
-        print("   - demo_los_angeles_weather.html") 
-        print("   - demo_chicago_weather.html")
+        for _, _, _, output_file in jobs:
+            print(f"   - {output_file}")
         print("\n🌐 Open any of these HTML files in your browser to view the interactive maps!")
         
     except Exception as e:
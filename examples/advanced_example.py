@@ -9,12 +9,45 @@ from xweather_client import XweatherClient
 from data_processor import WeatherDataProcessor
 from weather_map import WeatherMap
 from optimization import PerformanceOptimizer, MapPerformanceOptimizer
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import geopandas as gpd
 import logging
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def combine_observations(frames):
+    """
+    Stack observation frames column by column into preallocated arrays.
+    
+    Args:
+        frames: List of observation DataFrames with matching columns
+        
+    Returns:
+        Combined GeoDataFrame
+    """
+    total = sum(len(df) for df in frames)
+    columns = {}
+    
+    for col in frames[0].columns:
+        if col == 'geometry':
+            continue
+        
+        values = np.empty(total, dtype=np.result_type(*(df[col].to_numpy().dtype for df in frames)))
+        offset = 0
+        for df in frames:
+            values[offset:offset + len(df)] = df[col].to_numpy()
+            offset += len(df)
+        columns[col] = values
+    
+    return gpd.GeoDataFrame(
+        columns,
+        geometry=gpd.points_from_xy(columns['longitude'], columns['latitude']),
+        crs='EPSG:4326'
+    )
+
 def main():
     """Run advanced example."""
     try:
@@ -34,19 +67,21 @@ def main():
         
         all_observations = []
         
-        # Fetch data for each location
-        for lat, lon, name in locations:
-            logger.info(f"Fetching data for {name}")
+        # Fetch data for all locations concurrently
+        logger.info(f"Fetching data for {', '.join(name for _, _, name in locations)}")
+        with ThreadPoolExecutor(max_workers=len(locations)) as executor:
+            results = executor.map(
+                lambda loc: client.get_observations(loc[0], loc[1], radius=30), locations
+            )
             
-            # Get observations
-            observations = client.get_observations(lat, lon, radius=30)
-            if not observations.empty:
-                observations['city'] = name
-                all_observations.append(observations)
+            for (lat, lon, name), observations in zip(locations, results):
+                if not observations.empty:
+                    observations['city'] = name
+                    all_observations.append(observations)
         
         # Combine all observations
         if all_observations:
-            combined_obs = pd.concat(all_observations, ignore_index=True)
+            combined_obs = combine_observations(all_observations)
             
             # Process the data
             processed_data = processor.prepare_for_mapping(combined_obs)
@@ -86,5 +121,4 @@ def main():
     return 0
 
 if __name__ == "__main__":
-    import pandas as pd
     exit(main())
@@ -5,7 +5,7 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from main import HyperlocalWeatherApp
+from main import HyperlocalWeatherApp, MAP_FEATURES
 import logging
 
 # Set up logging
@@ -25,7 +25,8 @@ def main():
         logger.info(f"Fetching weather data for {lat}, {lon}")
         
         # Get weather data
-        weather_data = app.get_weather_data(lat, lon, radius, include_forecast=True)
+        weather_data = app.get_weather_data(lat, lon, radius, include_forecast=True,
+                                            features=MAP_FEATURES)
         
         # Create weather map
         map_path = app.create_weather_map(
@@ -26,6 +26,12 @@ def benchmark_performance():
         (33.4484, -112.0740, "Phoenix")
     ]
     
+    # Resolve output paths once for both benchmark passes
+    jobs = [
+        (lat, lon, name, f'examples/benchmark_{name.replace(" ", "_").lower()}')
+        for lat, lon, name in test_locations
+    ]
+    
     # Initialize app
     app = HyperlocalWeatherApp()
     
@@ -33,12 +39,12 @@ def benchmark_performance():
     logger.info("🚀 Testing without optimizations...")
     start_time = time.time()
     
-    for lat, lon, name in test_locations:
+    for lat, lon, name, output_prefix in jobs:
         try:
             weather_data = app.get_weather_data(lat, lon, radius=25)
             map_path = app.create_weather_map(
                 weather_data, 
-                f'examples/benchmark_{name.replace(" ", "_").lower()}_unoptimized.html'
+                f'{output_prefix}_unoptimized.html'
             )
         except Exception as e:
             logger.warning(f"Failed for {name}: {e}")
@@ -53,12 +59,12 @@ def benchmark_performance():
     logger.info("🚀 Testing with optimizations...")
     start_time = time.time()
     
-    for lat, lon, name in test_locations:
+    for lat, lon, name, output_prefix in jobs:
         try:
             weather_data = app.get_weather_data(lat, lon, radius=25)
             map_path = app.create_weather_map(
                 weather_data, 
-                f'examples/benchmark_{name.replace(" ", "_").lower()}_optimized.html'
+                f'{output_prefix}_optimized.html'
             )
         except Exception as e:
             logger.warning(f"Failed for {name}: {e}")
@@ -3,16 +3,33 @@ Main application for hyperlocal weather map.
 """
 import os
 import sys
+import asyncio
+import functools
 import logging
-from typing import Dict, Tuple
+import time
+from typing import Dict, List, Optional, Set, Tuple
 import pandas as pd
 import geopandas as gpd
 import requests
+from cachetools.func import ttl_cache
+from requests.adapters import HTTPAdapter, Retry
 
-from xweather_client import XweatherClient
+from xweather_client import XweatherClient, create_session
 from data_processor import WeatherDataProcessor
 from weather_map import WeatherMap
-from config import XWEATHER_CLIENT_ID, XWEATHER_CLIENT_SECRET
+from optimization import RequestCoalescer
+from config import (
+    XWEATHER_CLIENT_ID,
+    XWEATHER_CLIENT_SECRET,
+    CACHE_TTL,
+    HTTP_POOL_CONNECTIONS,
+    HTTP_POOL_MAXSIZE
+)
+
+try:
+    import orjson
+except ImportError:  # orjson is an optional speedup
+    orjson = None
 
 # Set up logging
 logging.basicConfig(
@@ -21,6 +38,26 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Processing stages rendered by create_weather_map
+MAP_FEATURES = frozenset({'observations', 'zones'})
+
+# Nominatim geocoding over a shared keep-alive session
+NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
+_GEOCODE_HEADERS = {"User-Agent": "HyperlocalWeatherMap/1.0"}
+GEOCODE_CACHE_TTL = 86400  # place names rarely move; keep hits for a day
+NOMINATIM_MIN_INTERVAL = 1.0  # seconds between requests, per the public usage policy
+_SESSION = requests.Session()
+_SESSION.mount('https://', HTTPAdapter(pool_connections=10, pool_maxsize=20))
+
+def _map_is_fresh(path: str, max_age: Optional[float]) -> bool:
+    """Return True if path exists and was written less than max_age seconds ago."""
+    if max_age is None:
+        return False
+    try:
+        return time.time() - os.path.getmtime(path) < max_age
+    except OSError:
+        return False
+
 class HyperlocalWeatherApp:
     """
     Main application class for hyperlocal weather mapping.
@@ -40,15 +77,33 @@ class HyperlocalWeatherApp:
         if not self.client_id or not self.client_secret:
             raise ValueError("Both Xweather client ID and client secret are required. Set XWEATHER_CLIENT_ID and XWEATHER_CLIENT_SECRET environment variables.")
         
+        # One pooled, retrying session shared by every Xweather request
+        self._session = create_session()
+        retries = Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504])
+        self._session.mount('https://', HTTPAdapter(pool_connections=HTTP_POOL_CONNECTIONS,
+                                                    pool_maxsize=HTTP_POOL_MAXSIZE,
+                                                    pool_block=False, max_retries=retries))
+        
         # Initialize components
-        self.client = XweatherClient(self.client_id, self.client_secret)
+        self.client = XweatherClient(self.client_id, self.client_secret, session=self._session)
         self.processor = WeatherDataProcessor()
         self.map_builder = WeatherMap()
         
         logger.info("Hyperlocal Weather App initialized")
     
+    def close(self) -> None:
+        """Release the pooled HTTP connections."""
+        self._session.close()
+    
+    def __enter__(self) -> 'HyperlocalWeatherApp':
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+    
     def get_weather_data(self, center_lat: float, center_lon: float, 
-                        radius: int = 50, include_forecast: bool = True) -> Dict:
+                        radius: int = 50, include_forecast: bool = True,
+                        features: Optional[Set[str]] = None) -> Dict:
         """
         Fetch and process weather data for a location.
         
@@ -57,6 +112,7 @@ class HyperlocalWeatherApp:
             center_lon: Center longitude
             radius: Search radius in kilometers
             include_forecast: Whether to include forecast data
+            features: Processing stages to run (see WeatherDataProcessor.prepare_for_mapping)
             
         Returns:
             Dictionary with processed weather data
@@ -70,7 +126,7 @@ class HyperlocalWeatherApp:
             )
             
             # Process the data
-            processed_data = self.processor.prepare_for_mapping(observations, forecast)
+            processed_data = self.processor.prepare_for_mapping(observations, forecast, features)
             
             logger.info(f"Retrieved {len(observations)} observations")
             if not forecast.empty:
@@ -82,10 +138,40 @@ class HyperlocalWeatherApp:
             logger.error(f"Error fetching weather data: {e}")
             raise
     
+    async def get_weather_data_many(self, locations: List[Tuple[float, float]],
+                                    radius: int = 50, include_forecast: bool = True,
+                                    features: Optional[Set[str]] = None) -> List[Dict]:
+        """
+        Fetch and process weather data for several locations at once.
+        
+        Requests are coalesced into batches and run on the default executor,
+        so they share the app's pooled session instead of running one by one.
+        
+        Args:
+            locations: (latitude, longitude) pairs to fetch
+            radius: Search radius in kilometers
+            include_forecast: Whether to include forecast data
+            features: Processing stages to run (see WeatherDataProcessor.prepare_for_mapping)
+            
+        Returns:
+            List of processed weather data dictionaries, in location order
+        """
+        loop = asyncio.get_running_loop()
+        coalescer = RequestCoalescer()
+        
+        def request_for(lat: float, lon: float):
+            fetch = functools.partial(self.get_weather_data, lat, lon, radius,
+                                      include_forecast, features)
+            return lambda: loop.run_in_executor(None, fetch)
+        
+        return await asyncio.gather(*(coalescer.submit(request_for(lat, lon))
+                                      for lat, lon in locations))
+    
     def create_weather_map(self, weather_data: Dict, 
                           output_file: str = 'weather_map.html',
                           tile_layer: str = 'satellite',
-                          auto_open: bool = True) -> str:
+                          auto_open: bool = True,
+                          max_age: Optional[float] = None) -> str:
         """
         Create and save a weather map.
         
@@ -94,10 +180,18 @@ class HyperlocalWeatherApp:
             output_file: Output HTML file path
             tile_layer: Base tile layer to use
             auto_open: Whether to automatically open in browser
+            max_age: Reuse output_file instead of rebuilding it if it was
+                written less than this many seconds ago. None always rebuilds.
             
         Returns:
             Path to saved map file
         """
+        if _map_is_fresh(output_file, max_age):
+            logger.info(f"Reusing recent weather map {output_file}")
+            if auto_open:
+                self.map_builder.open_map(output_file)
+            return output_file
+        
         logger.info("Creating weather map")
         
         try:
@@ -134,14 +228,24 @@ class HyperlocalWeatherApp:
         """
         logger.info(f"Running demo for location {location}")
         
+        # Rounded (~100 m) so repeat runs for the same place and radius share one file
+        output_file = f"demo_weather_map_{location[0]:.3f}_{location[1]:.3f}_{radius}km.html"
+        
         try:
+            # A map rendered within the data cache TTL is still current;
+            # checked once here so an expiring file is never rebuilt empty
+            if _map_is_fresh(output_file, CACHE_TTL):
+                logger.info(f"Reusing recent weather map {output_file}")
+                self.map_builder.open_map(output_file)
+                return output_file
+            
             # Get weather data
             weather_data = self.get_weather_data(
-                location[0], location[1], radius, include_forecast=True
+                location[0], location[1], radius, include_forecast=True,
+                features=MAP_FEATURES
             )
             
             # Create map
-            output_file = f"demo_weather_map_{location[0]}_{location[1]}.html"
             map_path = self.create_weather_map(
                 weather_data, 
                 output_file=output_file,
@@ -155,19 +259,79 @@ class HyperlocalWeatherApp:
             logger.error(f"Demo failed: {e}")
             raise
 
-def geocode_place(query: str) -> Tuple[float, float]:
-    """Geocode a place name to (lat, lon) using Nominatim (OSM)."""
-    url = "https://nominatim.openstreetmap.org/search"
-    params = {"q": query, "format": "json", "limit": 1}
-    headers = {"User-Agent": "HyperlocalWeatherMap/1.0"}
-    resp = requests.get(url, params=params, headers=headers, timeout=15)
-    resp.raise_for_status()
-    results = resp.json()
+def _parse_geocode_results(query: str, results: List[Dict]) -> Tuple[float, float]:
+    """Extract (lat, lon) from a Nominatim search response."""
     if not results:
         raise ValueError(f"Location not found: {query}")
     return float(results[0]["lat"]), float(results[0]["lon"])
 
 
+@ttl_cache(maxsize=1024, ttl=GEOCODE_CACHE_TTL)
+def geocode_place(query: str) -> Tuple[float, float]:
+    """Geocode a place name to (lat, lon) using Nominatim (OSM), cached per query."""
+    params = {"q": query, "format": "json", "limit": 1}
+    resp = _SESSION.get(NOMINATIM_URL, params=params, headers=_GEOCODE_HEADERS, timeout=15)
+    resp.raise_for_status()
+    results = orjson.loads(resp.content) if orjson is not None else resp.json()
+    return _parse_geocode_results(query, results)
+
+
+async def geocode_places(queries: List[str], max_concurrency: int = 1,
+                         min_interval: float = NOMINATIM_MIN_INTERVAL) -> List[Tuple[float, float]]:
+    """
+    Geocode several place names over one keep-alive aiohttp session.
+    
+    The public Nominatim server allows about one request per second, so by
+    default requests run one at a time and start at least min_interval
+    seconds apart; lower min_interval and raise max_concurrency only for a
+    self-hosted instance. Requires the optional aiohttp dependency.
+    
+    Args:
+        queries: Place names to geocode
+        max_concurrency: Maximum number of requests in flight
+        min_interval: Minimum seconds between the starts of two requests
+        
+    Returns:
+        List of (lat, lon) tuples in the same order as queries
+    """
+    import aiohttp
+    
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(max_concurrency)
+    pacing = asyncio.Lock()
+    next_start = loop.time()
+    timeout = aiohttp.ClientTimeout(total=15)
+    
+    async def wait_turn() -> None:
+        """Space request starts min_interval apart; the semaphore only caps requests in flight."""
+        nonlocal next_start
+        async with pacing:
+            delay = next_start - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            next_start = loop.time() + min_interval
+    
+    async with aiohttp.ClientSession(headers=_GEOCODE_HEADERS, timeout=timeout) as session:
+        async def fetch(query: str) -> Tuple[float, float]:
+            params = {"q": query, "format": "json", "limit": "1"}
+            async with semaphore:
+                await wait_turn()
+                async with session.get(NOMINATIM_URL, params=params) as resp:
+                    resp.raise_for_status()
+                    if orjson is not None:
+                        results = await resp.json(loads=orjson.loads)
+                    else:
+                        results = await resp.json()
+                    return _parse_geocode_results(query, results)
+        
+        # Resolve each distinct query once
+        unique_queries = list(dict.fromkeys(queries))
+        results = await asyncio.gather(*(fetch(q) for q in unique_queries))
+    
+    resolved = dict(zip(unique_queries, results))
+    return [resolved[q] for q in queries]
+
+
 def main():
     """Main function to run the application."""
     import argparse
@@ -199,7 +363,7 @@ def main():
         app = HyperlocalWeatherApp()
         
         # Get weather data
-        weather_data = app.get_weather_data(lat, lon, args.radius)
+        weather_data = app.get_weather_data(lat, lon, args.radius, features=MAP_FEATURES)
         
         # Create map
         map_path = app.create_weather_map(
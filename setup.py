@@ -47,6 +47,17 @@ setup(
             "sphinx-rtd-theme>=0.5",
             "myst-parser>=0.15",
         ],
+        "fast": [
+            "numba>=0.57",
+            "orjson>=3.9",
+            "brotli>=1.0",
+        ],
+        "async": [
+            "aiohttp>=3.8",
+        ],
+        "cache": [
+            "requests-cache>=1.1",
+        ],
     },
     entry_points={
         "console_scripts": [
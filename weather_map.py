@@ -2,19 +2,236 @@
 Interactive weather map visualization using Xweather tiles and Folium.
 """
 import folium
+import numpy as np
 import pandas as pd
 import geopandas as gpd
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Sequence, Tuple, Union
 import json
 import logging
 import webbrowser
 import os
-from config import MAP_TILES_BASE_URL, XWEATHER_CLIENT_ID, XWEATHER_CLIENT_SECRET, DEFAULT_ZOOM, DEFAULT_CENTER
-from folium.plugins import Geocoder, LocateControl, MousePosition
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
+from itertools import product
+from string import Formatter
+from types import MappingProxyType
+from config import MAP_TILES_BASE_URL, XWEATHER_CLIENT_ID, XWEATHER_CLIENT_SECRET, DEFAULT_ZOOM, DEFAULT_CENTER, CACHE_TTL
+from folium.plugins import Geocoder, LocateControl, MousePosition, HeatMap
 from folium import LatLngPopup
+from jinja2 import Template
+
+try:
+    import numba as nb
+except ImportError:  # numba is an optional speedup
+    nb = None
 
 logger = logging.getLogger(__name__)
 
+# Observation marker colors by temperature band (°F), checked in order
+OBS_COLOR_THRESHOLDS = (32, 50, 70, 90)
+OBS_COLORS = ('blue', 'lightblue', 'green', 'orange')
+OBS_COLOR_HOT = 'red'
+OBS_COLOR_MISSING = 'gray'
+
+# Weather zone marker colors by label keyword, checked in order
+ZONE_COLORS = (('Cold', 'blue'), ('Moderate', 'green'), ('Warm', 'red'))
+ZONE_COLOR_DEFAULT = 'gray'
+
+# Xweather tile layers (credentials embedded in path), built once from config
+TILE_LAYERS = MappingProxyType({
+    "terrain":   f"{MAP_TILES_BASE_URL}/{XWEATHER_CLIENT_ID}_{XWEATHER_CLIENT_SECRET}/terrain/{{z}}/{{x}}/{{y}}.png",
+    "satellite": f"{MAP_TILES_BASE_URL}/{XWEATHER_CLIENT_ID}_{XWEATHER_CLIENT_SECRET}/satellite/{{z}}/{{x}}/{{y}}.png",
+    "street":    f"{MAP_TILES_BASE_URL}/{XWEATHER_CLIENT_ID}_{XWEATHER_CLIENT_SECRET}/street/{{z}}/{{x}}/{{y}}.png",
+})
+
+# Weather overlays (credentials embedded; current frame)
+WEATHER_LAYERS = MappingProxyType({
+    "radar":        f"{MAP_TILES_BASE_URL}/{XWEATHER_CLIENT_ID}_{XWEATHER_CLIENT_SECRET}/radar/{{z}}/{{x}}/{{y}}/current.png",
+    "temperatures": f"{MAP_TILES_BASE_URL}/{XWEATHER_CLIENT_ID}_{XWEATHER_CLIENT_SECRET}/temperatures/{{z}}/{{x}}/{{y}}/current.png",
+    "wind":         f"{MAP_TILES_BASE_URL}/{XWEATHER_CLIENT_ID}_{XWEATHER_CLIENT_SECRET}/wind/{{z}}/{{x}}/{{y}}/current.png",
+})
+
+# Local overlay tile cache written by WeatherMap._prefetch_tiles
+TILE_CACHE_DIR = 'tile_cache'
+TILE_CACHE_TTL = CACHE_TTL  # overlays are the current frame, so expire with the data
+TILE_PREFETCH_WORKERS = 32
+TILE_PREFETCH_MARGIN = 0.25  # degrees around the center when there are no observations
+_MERCATOR_MAX_LAT = 85.0511
+
+# Color lookup indexed by _bucket_temps: missing, then each band, then hot
+_COLOR_TABLE = np.array([OBS_COLOR_MISSING, *OBS_COLORS, OBS_COLOR_HOT], dtype=object)
+_COLOR_THRESHOLDS = np.array(OBS_COLOR_THRESHOLDS, dtype=np.float64)
+
+# Below this many markers the JIT dispatch overhead outweighs the numpy path
+NUMBA_MIN_MARKERS = 1000
+
+if nb is not None:
+    @nb.njit(cache=True)
+    def _bucket_temps_kernel(temps, thresholds, out):
+        """Write the _COLOR_TABLE index for each temperature into out."""
+        for i in range(temps.shape[0]):
+            temp = temps[i]
+            if np.isnan(temp):
+                out[i] = 0
+                continue
+            bucket = thresholds.shape[0] + 1
+            for j in range(thresholds.shape[0]):
+                if temp < thresholds[j]:
+                    bucket = j + 1
+                    break
+            out[i] = bucket
+
+def _bucket_temps(temps: np.ndarray) -> np.ndarray:
+    """Map temperatures (°F) to int8 indices into _COLOR_TABLE."""
+    if nb is not None and len(temps) >= NUMBA_MIN_MARKERS:
+        out = np.empty(len(temps), dtype=np.int8)
+        _bucket_temps_kernel(temps, _COLOR_THRESHOLDS, out)
+        return out
+    
+    out = (np.searchsorted(_COLOR_THRESHOLDS, temps, side='right') + 1).astype(np.int8)
+    out[np.isnan(temps)] = 0
+    return out
+
+def _tile_ranges(bbox: Tuple[float, float, float, float], zoom: int) -> Tuple[range, range]:
+    """Return the slippy-map x and y tile ranges covering (min_lat, min_lon, max_lat, max_lon)."""
+    min_lat, min_lon, max_lat, max_lon = bbox
+    n = 2 ** zoom
+    lats = np.radians(np.clip([max_lat, min_lat], -_MERCATOR_MAX_LAT, _MERCATOR_MAX_LAT))
+    ys = (1 - np.arcsinh(np.tan(lats)) / np.pi) / 2 * n
+    xs = (np.array([min_lon, max_lon]) + 180) / 360 * n
+    xs = np.clip(xs.astype(int), 0, n - 1)
+    ys = np.clip(ys.astype(int), 0, n - 1)
+    return range(xs[0], xs[1] + 1), range(ys[0], ys[1] + 1)
+
+# Popup templates; observation popups are assembled in the browser, the rest with str.format_map
+_OBS_POPUP_TEMPLATE = """
+<div style="font-family: Arial; width: 200px;">
+    <h4>{name}</h4>
+    <p><strong>Temperature:</strong> {temperature}°F</p>
+    <p><strong>Humidity:</strong> {humidity}%</p>
+    <p><strong>Pressure:</strong> {pressure} inHg</p>
+    <p><strong>Wind:</strong> {wind_speed} mph</p>
+    <p><strong>Weather:</strong> {weather}</p>
+</div>
+"""
+
+_ZONE_POPUP_TEMPLATE = """
+<div style="font-family: Arial;">
+    <h4>{zone}</h4>
+    <p><strong>Stations:</strong> {station_count}</p>
+    <p><strong>Avg Temp:</strong> {temp_mean:.1f}°F</p>
+    <p><strong>Humidity:</strong> {humidity_mean:.1f}%</p>
+</div>
+"""
+
+_FORECAST_POPUP_TEMPLATE = """
+<div style="font-family: Arial; width: 250px;">
+    <h4>Forecast - {datetime:.10}</h4>
+    <p><strong>High:</strong> {temperature_max}°F</p>
+    <p><strong>Low:</strong> {temperature_min}°F</p>
+    <p><strong>Humidity:</strong> {humidity}%</p>
+    <p><strong>Wind:</strong> {wind_speed} mph</p>
+    <p><strong>Weather:</strong> {weather}</p>
+</div>
+"""
+
+def _widen_float32(values: np.ndarray) -> np.ndarray:
+    """Widen float32 readings via their shortest repr, so 30.12 displays as 30.12 rather than 30.1200008392334."""
+    return values.astype(str).astype(np.float64)
+
+def _column_as_str(df: pd.DataFrame, column: str, default: str) -> pd.Series:
+    """Return a column rendered as strings, or default for every row if absent."""
+    if column not in df.columns:
+        return pd.Series(default, index=df.index, dtype=object)
+    values = df[column].to_numpy()
+    if values.dtype.kind != 'f':
+        # Object round trip so missing values render like the rest of the column
+        values = values.astype(object)
+    # Floats are formatted at their stored precision, never widened first
+    return pd.Series(values.astype(str), index=df.index, dtype=object)
+
+def _template_parts(template: str) -> List[Tuple[str, Optional[str]]]:
+    """Split a template into (literal, field) pairs; field is None after the last placeholder."""
+    return [(literal, field) for literal, field, _, _ in Formatter().parse(template)]
+
+# Observation popup pieces, joined client-side when a popup is opened
+_OBS_POPUP_PARTS = _template_parts(_OBS_POPUP_TEMPLATE)
+
+def _select_columns(df: pd.DataFrame, required: List[str], defaults: Dict[str, object]) -> pd.DataFrame:
+    """Select required columns plus optional ones, filling absent optional columns with defaults."""
+    missing = {column: value for column, value in defaults.items() if column not in df.columns}
+    selected = df.assign(**missing)[required + list(defaults)]
+    
+    # Popups format row values with str.format_map, which would show float32 noise
+    widened = {column: _widen_float32(selected[column].to_numpy())
+               for column, dtype in selected.dtypes.items() if dtype == np.float32}
+    return selected.assign(**widened)
+
+class _ObservationMarkers(folium.MacroElement):
+    """
+    Circle markers for every observation, emitted as one script block.
+    
+    Marker data is inlined as a single column-oriented JSON object and the
+    markers are created client-side, instead of one folium element (and one
+    rendered template) per station. Popup HTML is only the short per-station
+    values plus one shared template, and is assembled when a popup opens.
+    """
+    
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+        (function() {
+            var data = {{ this.data|safe }};
+            {% if this.popup_parts %}
+            var popupParts = {{ this.popup_parts|safe }};
+            
+            function popupHtml(i) {
+                var html = '';
+                for (var j = 0; j < popupParts.length; j++) {
+                    html += popupParts[j][0];
+                    if (popupParts[j][1] !== null) {
+                        html += data[popupParts[j][1]][i];
+                    }
+                }
+                return html;
+            }
+            {% endif %}
+            
+            for (let i = 0; i < data.lat.length; i++) {
+                var marker = L.circleMarker([data.lat[i], data.lon[i]], {
+                    radius: 8, color: 'white', weight: 2,
+                    fillColor: data.color[i], fillOpacity: 0.8
+                }).bindTooltip('Temp: ' + data.temperature[i] + '\u00b0F');
+                {% if this.popup_parts %}
+                marker.bindPopup(function() { return popupHtml(i); }, {maxWidth: 250});
+                {% endif %}
+                marker.addTo({{ this._parent.get_name() }});
+            }
+        })();
+        {% endmacro %}
+    """)
+    
+    def __init__(self, data: Dict[str, list],
+                 popup_parts: Optional[List[Tuple[str, Optional[str]]]] = None):
+        """
+        Initialize the marker layer.
+        
+        Args:
+            data: Equal-length lists under 'lat', 'lon', 'color' and
+                'temperature', plus one list per popup field
+            popup_parts: (literal, field) pairs from _template_parts, or
+                None to add no popups
+        """
+        super().__init__()
+        self._name = 'ObservationMarkers'
+        # Escape '</' so popup markup cannot close the surrounding <script>
+        self.data = json.dumps(data).replace('</', '<\\/')
+        self.popup_parts = None
+        if popup_parts is not None:
+            self.popup_parts = json.dumps(popup_parts).replace('</', '<\\/')
+
 class WeatherMap:
     """
     Create interactive weather maps using Xweather tiles and weather data.
@@ -31,19 +248,9 @@ class WeatherMap:
         self.center = center or DEFAULT_CENTER
         self.zoom = zoom or DEFAULT_ZOOM
         
-        # Xweather tile layers (credentials embedded in path)
-        self.tile_layers = {
-            "terrain":   f"{MAP_TILES_BASE_URL}/{XWEATHER_CLIENT_ID}_{XWEATHER_CLIENT_SECRET}/terrain/{{z}}/{{x}}/{{y}}.png",
-            "satellite": f"{MAP_TILES_BASE_URL}/{XWEATHER_CLIENT_ID}_{XWEATHER_CLIENT_SECRET}/satellite/{{z}}/{{x}}/{{y}}.png",
-            "street":    f"{MAP_TILES_BASE_URL}/{XWEATHER_CLIENT_ID}_{XWEATHER_CLIENT_SECRET}/street/{{z}}/{{x}}/{{y}}.png",
-        }
-        
-        # Weather overlays (credentials embedded; current frame)
-        self.weather_layers = {
-            "radar":        f"{MAP_TILES_BASE_URL}/{XWEATHER_CLIENT_ID}_{XWEATHER_CLIENT_SECRET}/radar/{{z}}/{{x}}/{{y}}/current.png",
-            "temperatures": f"{MAP_TILES_BASE_URL}/{XWEATHER_CLIENT_ID}_{XWEATHER_CLIENT_SECRET}/temperatures/{{z}}/{{x}}/{{y}}/current.png",
-            "wind":         f"{MAP_TILES_BASE_URL}/{XWEATHER_CLIENT_ID}_{XWEATHER_CLIENT_SECRET}/wind/{{z}}/{{x}}/{{y}}/current.png",
-        }
+        # Xweather tile layer URLs, shared by every instance
+        self.tile_layers = TILE_LAYERS
+        self.weather_layers = WEATHER_LAYERS
     
     def create_base_map(self, tile_layer: str = 'satellite') -> folium.Map:
         """
@@ -111,75 +318,67 @@ class WeatherMap:
         # Create feature group for observations
         obs_group = folium.FeatureGroup(name="Weather Observations")
         
-        for idx, row in observations.iterrows():
-            if pd.isna(row['latitude']) or pd.isna(row['longitude']):
-                continue
-            
-            # Determine marker color based on temperature
-            temp = row.get('temperature', 0)
-            if pd.isna(temp):
-                color = 'gray'
-            elif temp < 32:
-                color = 'blue'
-            elif temp < 50:
-                color = 'lightblue'
-            elif temp < 70:
-                color = 'green'
-            elif temp < 90:
-                color = 'orange'
-            else:
-                color = 'red'
-            
-            # Create popup content
-            popup_content = ""
-            if show_popup:
-                popup_content = f"""
-                <div style="font-family: Arial; width: 200px;">
-                    <h4>{row.get('name', 'Weather Station')}</h4>
-                    <p><strong>Temperature:</strong> {temp:.1f}°F</p>
-                    <p><strong>Humidity:</strong> {row.get('humidity', 'N/A')}%</p>
-                    <p><strong>Pressure:</strong> {row.get('pressure', 'N/A')} inHg</p>
-                    <p><strong>Wind:</strong> {row.get('wind_speed', 'N/A')} mph</p>
-                    <p><strong>Weather:</strong> {row.get('weather', 'N/A')}</p>
-                </div>
-                """
-            
-            # Add marker
-            folium.CircleMarker(
-                location=[row['latitude'], row['longitude']],
-                radius=8,
-                popup=folium.Popup(popup_content, max_width=250),
-                color='white',
-                weight=2,
-                fillColor=color,
-                fillOpacity=0.8,
-                tooltip=f"Temp: {temp:.1f}°F"
-            ).add_to(obs_group)
+        obs = observations.dropna(subset=['latitude', 'longitude'])
+        if obs.empty:
+            obs_group.add_to(map_obj)
+            return map_obj
+        
+        if 'temperature' in obs.columns:
+            temps = obs['temperature'].to_numpy(dtype=np.float64)
+        else:
+            temps = np.zeros(len(obs))
+        
+        # Determine marker colors based on temperature
+        colors = _COLOR_TABLE[_bucket_temps(temps)]
+        
+        # Marker data for all stations at once, column-oriented
+        markers = {
+            'lat': obs['latitude'].to_numpy(dtype=np.float64).tolist(),
+            'lon': obs['longitude'].to_numpy(dtype=np.float64).tolist(),
+            'color': colors.tolist(),
+            'temperature': np.char.mod('%.1f', temps).tolist(),
+        }
+        
+        # Popup values only; the browser fills them into the shared template
+        popup_parts = None
+        if show_popup:
+            markers.update({
+                'name': _column_as_str(obs, 'name', 'Weather Station').tolist(),
+                'humidity': _column_as_str(obs, 'humidity', 'N/A').tolist(),
+                'pressure': _column_as_str(obs, 'pressure', 'N/A').tolist(),
+                'wind_speed': _column_as_str(obs, 'wind_speed', 'N/A').tolist(),
+                'weather': _column_as_str(obs, 'weather', 'N/A').tolist(),
+            })
+            popup_parts = _OBS_POPUP_PARTS
+        
+        # One script block instead of a folium element per station
+        _ObservationMarkers(markers, popup_parts).add_to(obs_group)
         
         obs_group.add_to(map_obj)
         return map_obj
     
     def add_weather_heatmap(self, map_obj: folium.Map, 
-                          heatmap_data: List[Tuple[float, float, float]]) -> folium.Map:
+                          heatmap_data: Union[np.ndarray, Sequence[Tuple[float, float, float]]]) -> folium.Map:
         """
         Add temperature heatmap to the map.
         
         Args:
             map_obj: Folium map object
-            heatmap_data: List of (lat, lon, value) tuples
+            heatmap_data: (n, 3) array or sequence of (lat, lon, value) rows
             
         Returns:
             Updated map object
         """
-        if not heatmap_data:
+        if len(heatmap_data) == 0:
             return map_obj
         
-        # Convert to the format expected by HeatMap
-        heatmap_points = [[point[0], point[1], point[2]] for point in heatmap_data]
+        # Convert to the format expected by HeatMap in one pass
+        if isinstance(heatmap_data, np.ndarray):
+            heatmap_points = heatmap_data[:, :3].tolist()
+        else:
+            heatmap_points = [[point[0], point[1], point[2]] for point in heatmap_data]
         
         # Add heatmap layer
-        from folium.plugins import HeatMap
-        
         heatmap_layer = HeatMap(
             heatmap_points,
             name="Temperature Heatmap",
@@ -211,30 +410,25 @@ class WeatherMap:
         # Create feature group for zones
         zones_group = folium.FeatureGroup(name="Weather Zones")
         
-        for idx, row in zones.iterrows():
-            # Determine zone color
-            zone = row.get('zone', '')
-            if 'Cold' in zone:
-                color = 'blue'
-            elif 'Moderate' in zone:
-                color = 'green'
-            elif 'Warm' in zone:
-                color = 'red'
-            else:
-                color = 'gray'
-            
+        zone_frame = _select_columns(
+            zones, ['lat_mean', 'lon_mean'],
+            {'zone': '', 'station_count': 0, 'temp_mean': 0, 'humidity_mean': 0}
+        )
+        
+        # Determine zone colors for the whole column at once
+        zone_names = zone_frame['zone'].astype(str)
+        colors = np.select(
+            [zone_names.str.contains(keyword, regex=False, na=False) for keyword, _ in ZONE_COLORS],
+            [color for _, color in ZONE_COLORS],
+            default=ZONE_COLOR_DEFAULT
+        ).tolist()
+        
+        for row, color in zip(zone_frame.itertuples(index=False), colors):
             # Add zone marker
             folium.CircleMarker(
-                location=[row['lat_mean'], row['lon_mean']],
+                location=[row.lat_mean, row.lon_mean],
                 radius=15,
-                popup=f"""
-                <div style="font-family: Arial;">
-                    <h4>{zone}</h4>
-                    <p><strong>Stations:</strong> {row.get('station_count', 0)}</p>
-                    <p><strong>Avg Temp:</strong> {row.get('temp_mean', 0):.1f}°F</p>
-                    <p><strong>Humidity:</strong> {row.get('humidity_mean', 0):.1f}%</p>
-                </div>
-                """,
+                popup=_ZONE_POPUP_TEMPLATE.format_map(row._asdict()),
                 color='white',
                 weight=3,
                 fillColor=color,
@@ -245,17 +439,29 @@ class WeatherMap:
         return map_obj
     
     def add_weather_overlays(self, map_obj: folium.Map, 
-                           overlay_types: List[str] = None) -> folium.Map:
+                           overlay_types: List[str] = None,
+                           tile_urls: Optional[Dict[str, str]] = None) -> folium.Map:
         """
         Add Xweather weather overlay layers.
+        
+        Args:
+            map_obj: Folium map object
+            overlay_types: Overlay names to add. If None, radar, temperatures and wind.
+            tile_urls: Per-overlay URL templates used instead of the Xweather
+                ones for this map only, e.g. from _prefetch_tiles
+            
+        Returns:
+            Updated map object
         """
         if overlay_types is None:
             overlay_types = ["radar", "temperatures", "wind"]
         
+        layer_urls = {**self.weather_layers, **(tile_urls or {})}
+        
         for overlay_type in overlay_types:
-            if overlay_type in self.weather_layers:
+            if overlay_type in layer_urls:
                 folium.TileLayer(
-                    tiles=self.weather_layers[overlay_type],
+                    tiles=layer_urls[overlay_type],
                     attr='Xweather',
                     name=f'{overlay_type.title()} Overlay',
                     overlay=True,
@@ -265,6 +471,86 @@ class WeatherMap:
         
         return map_obj
     
+    def _prefetch_tiles(self, z_levels: Sequence[int],
+                        bbox: Tuple[float, float, float, float],
+                        layers: Optional[Sequence[str]] = None,
+                        output_file: Optional[str] = None) -> Dict[str, str]:
+        """
+        Download overlay tiles covering bbox into TILE_CACHE_DIR.
+        
+        Tiles already on disk are reused only while younger than
+        TILE_CACHE_TTL, since the overlays show the current frame. Tiles
+        outside bbox or z_levels are not available from the cache.
+        
+        Args:
+            z_levels: Zoom levels to fetch
+            bbox: (min_lat, min_lon, max_lat, max_lon) area to cover
+            layers: Overlay names to fetch. If None, all weather layers.
+            output_file: Path the map will be saved to; the returned
+                templates are relative to its directory. If None, the
+                current directory.
+            
+        Returns:
+            Local tile URL templates for the layers whose tiles are all
+            cached, for add_weather_overlays(tile_urls=...)
+        """
+        if layers is None:
+            layers = list(self.weather_layers)
+        layers = [layer for layer in layers if layer in self.weather_layers]
+        
+        now = time.time()
+        jobs = []
+        for layer in layers:
+            url_template = self.weather_layers[layer]
+            for z in z_levels:
+                x_range, y_range = _tile_ranges(bbox, z)
+                for x, y in product(x_range, y_range):
+                    path = os.path.join(TILE_CACHE_DIR, layer, str(z), str(x), f"{y}.png")
+                    try:
+                        fresh = now - os.path.getmtime(path) < TILE_CACHE_TTL
+                    except OSError:
+                        fresh = False
+                    if not fresh:
+                        jobs.append((layer, url_template.format(z=z, x=x, y=y), path))
+        
+        with requests.Session() as session:
+            adapter = HTTPAdapter(pool_maxsize=TILE_PREFETCH_WORKERS)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            
+            def fetch(job: Tuple[str, str, str]) -> bool:
+                _, url, path = job
+                try:
+                    response = session.get(url, timeout=15)
+                    response.raise_for_status()
+                except requests.exceptions.RequestException:
+                    return False
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                # Replace atomically so a half-written tile is never served
+                tmp_path = f"{path}.{threading.get_ident()}.tmp"
+                with open(tmp_path, 'wb') as f:
+                    f.write(response.content)
+                os.replace(tmp_path, path)
+                return True
+            
+            with ThreadPoolExecutor(max_workers=TILE_PREFETCH_WORKERS) as executor:
+                results = list(executor.map(fetch, jobs))
+        
+        incomplete = {layer for (layer, _, _), ok in zip(jobs, results) if not ok}
+        failed = results.count(False)
+        if failed:
+            logger.warning(f"Failed to prefetch {failed} of {len(jobs)} overlay tiles; "
+                           f"serving {', '.join(sorted(incomplete))} remotely")
+        logger.info(f"Prefetched {len(jobs) - failed} overlay tiles into {TILE_CACHE_DIR}")
+        
+        # Leaflet resolves relative tile URLs against the saved page
+        base_dir = os.path.dirname(os.path.abspath(output_file)) if output_file else os.getcwd()
+        cache_dir = os.path.relpath(os.path.abspath(TILE_CACHE_DIR), base_dir).replace(os.sep, '/')
+        return {
+            layer: f"{cache_dir}/{layer}/{{z}}/{{x}}/{{y}}.png"
+            for layer in layers if layer not in incomplete
+        }
+    
     def add_forecast_markers(self, map_obj: folium.Map, 
                            forecast: gpd.GeoDataFrame) -> folium.Map:
         """
@@ -283,22 +569,19 @@ class WeatherMap:
         # Create feature group for forecast
         forecast_group = folium.FeatureGroup(name="Weather Forecast")
         
-        for idx, row in forecast.iterrows():
+        forecast_rows = _select_columns(
+            forecast, ['latitude', 'longitude'],
+            {'datetime': 'N/A', 'temperature_max': 'N/A', 'temperature_min': 'N/A',
+             'humidity': 'N/A', 'wind_speed': 'N/A', 'weather': 'N/A'}
+        ).itertuples(index=False)
+        
+        for row in forecast_rows:
             # Create forecast popup
-            popup_content = f"""
-            <div style="font-family: Arial; width: 250px;">
-                <h4>Forecast - {row.get('datetime', 'N/A')[:10]}</h4>
-                <p><strong>High:</strong> {row.get('temperature_max', 'N/A')}°F</p>
-                <p><strong>Low:</strong> {row.get('temperature_min', 'N/A')}°F</p>
-                <p><strong>Humidity:</strong> {row.get('humidity', 'N/A')}%</p>
-                <p><strong>Wind:</strong> {row.get('wind_speed', 'N/A')} mph</p>
-                <p><strong>Weather:</strong> {row.get('weather', 'N/A')}</p>
-            </div>
-            """
+            popup_content = _FORECAST_POPUP_TEMPLATE.format_map(row._asdict())
             
             # Add forecast marker
             folium.Marker(
-                location=[row['latitude'], row['longitude']],
+                location=[row.latitude, row.longitude],
                 popup=folium.Popup(popup_content, max_width=300),
                 icon=folium.Icon(
                     icon='cloud',
@@ -315,7 +598,9 @@ class WeatherMap:
                               tile_layer: str = 'satellite',
                               show_heatmap: bool = True,
                               show_zones: bool = True,
-                              show_overlays: bool = True) -> folium.Map:
+                              show_overlays: bool = True,
+                              prefetch_tiles: bool = False,
+                              output_file: Optional[str] = None) -> folium.Map:
         """
         Create a comprehensive weather map with all available data.
         
@@ -325,6 +610,10 @@ class WeatherMap:
             show_heatmap: Whether to show temperature heatmap
             show_zones: Whether to show weather zones
             show_overlays: Whether to show weather overlays
+            prefetch_tiles: Download the overlay tiles around the observations
+                at the initial zoom into TILE_CACHE_DIR and serve them from there
+            output_file: Path the map will be saved to, so prefetched tile
+                URLs resolve from it. If None, the current directory.
             
         Returns:
             Complete weather map
@@ -351,7 +640,11 @@ class WeatherMap:
         
         # Add weather overlays
         if show_overlays:
-            m = self.add_weather_overlays(m)
+            tile_urls = None
+            if prefetch_tiles:
+                tile_urls = self._prefetch_tiles([self.zoom], self._prefetch_bbox(weather_data),
+                                                 output_file=output_file)
+            m = self.add_weather_overlays(m, tile_urls=tile_urls)
         
         # Add layer control
         folium.LayerControl().add_to(m)
@@ -361,21 +654,32 @@ class WeatherMap:
         
         return m
     
-    def _create_heatmap_data(self, observations: gpd.GeoDataFrame) -> List[Tuple[float, float, float]]:
+    def _prefetch_bbox(self, weather_data: Dict[str, gpd.GeoDataFrame]) -> Tuple[float, float, float, float]:
+        """Bounding box of the observations, or a margin around the center if there are none."""
+        observations = weather_data.get('observations')
+        if observations is not None and not observations.empty:
+            lats = observations['latitude'].astype(float)
+            lons = observations['longitude'].astype(float)
+            return lats.min(), lons.min(), lats.max(), lons.max()
+        
+        lat, lon = self.center
+        return (lat - TILE_PREFETCH_MARGIN, lon - TILE_PREFETCH_MARGIN,
+                lat + TILE_PREFETCH_MARGIN, lon + TILE_PREFETCH_MARGIN)
+    
+    def _create_heatmap_data(self, observations: gpd.GeoDataFrame) -> List[List[float]]:
         """Create heatmap data from observations."""
-        if observations.empty:
+        if observations.empty or 'temperature' not in observations.columns:
             return []
         
-        heatmap_data = []
-        for idx, row in observations.iterrows():
-            if not pd.isna(row.get('temperature')):
-                heatmap_data.append((
-                    row['latitude'],
-                    row['longitude'],
-                    row['temperature']
-                ))
-        
-        return heatmap_data
+        temps = observations['temperature'].to_numpy()
+        # Intensities are inlined in the page, so keep them free of float32 noise too
+        temps = _widen_float32(temps) if temps.dtype == np.float32 else temps.astype(np.float64)
+        mask = ~np.isnan(temps)
+        return np.column_stack((
+            observations['latitude'].to_numpy(dtype=np.float64)[mask],
+            observations['longitude'].to_numpy(dtype=np.float64)[mask],
+            temps[mask]
+        )).tolist()
     
     def _add_legend(self, map_obj: folium.Map):
         """Add a legend to the map."""
@@ -408,8 +712,17 @@ class WeatherMap:
         logger.info(f"Map saved to {filename}")
         
         if auto_open:
-            # Get the absolute path
-            abs_path = os.path.abspath(filename)
-            # Open in default browser
-            webbrowser.open(f'file://{abs_path}')
-            logger.info(f"Map opened in browser: {abs_path}")
+            self.open_map(filename)
+    
+    def open_map(self, filename: str):
+        """
+        Open a saved map file in the default browser.
+        
+        Args:
+            filename: Path to the map HTML file
+        """
+        # Get the absolute path
+        abs_path = os.path.abspath(filename)
+        # Open in default browser
+        webbrowser.open(f'file://{abs_path}')
+        logger.info(f"Map opened in browser: {abs_path}")
@@ -8,33 +8,108 @@ from typing import Dict, List, Optional, Tuple
 from cachetools import TTLCache
 import time
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from config import (
     XWEATHER_CLIENT_ID, 
     XWEATHER_CLIENT_SECRET,
     XWEATHER_BASE_URL, 
-    FORECAST_ENDPOINT, 
-    OBSERVATIONS_ENDPOINT,
+    FORECAST_URL_FMT,
+    OBSERVATIONS_URL_FMT,
     CACHE_TTL,
-    MAX_CACHE_SIZE
+    MAX_CACHE_SIZE,
+    CACHE_COORD_DECIMALS,
+    HTTP_CACHE_NAME,
+    HTTP_POOL_CONNECTIONS,
+    HTTP_POOL_MAXSIZE
 )
 from requests.adapters import HTTPAdapter, Retry
 
+try:
+    import orjson
+except ImportError:  # orjson is an optional speedup
+    orjson = None
+
+try:
+    import requests_cache
+except ImportError:  # requests-cache is an optional on-disk cache
+    requests_cache = None
+
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Observation columns as (column, response section, key); section None is top level
+OBSERVATION_FIELDS = (
+    ('latitude', 'loc', 'lat'),
+    ('longitude', 'loc', 'long'),
+    ('station_id', None, 'id'),
+    ('name', 'place', 'name'),
+    ('temperature', 'ob', 'tempF'),
+    ('humidity', 'ob', 'humidity'),
+    ('pressure', 'ob', 'pressureIN'),
+    ('wind_speed', 'ob', 'windSpeedMPH'),
+    ('wind_direction', 'ob', 'windDir'),
+    ('weather', 'ob', 'weather'),
+    ('timestamp', 'ob', 'dateTimeISO'),
+)
+
+# Forecast columns as (column, period key)
+FORECAST_FIELDS = (
+    ('datetime', 'dateTimeISO'),
+    ('temperature_max', 'maxTempF'),
+    ('temperature_min', 'minTempF'),
+    ('humidity', 'humidity'),
+    ('pressure', 'pressureIN'),
+    ('wind_speed', 'windSpeedMPH'),
+    ('wind_direction', 'windDir'),
+    ('weather', 'weather'),
+    ('precip_probability', 'precipIN'),
+    ('snow_probability', 'snowIN'),
+)
+
+def _points(df: pd.DataFrame) -> gpd.GeoSeries:
+    """Build point geometries from the longitude/latitude columns in one vectorized call."""
+    return gpd.GeoSeries.from_xy(df['longitude'].astype(float), df['latitude'].astype(float),
+                                 crs='EPSG:4326')
+
+def create_session() -> requests.Session:
+    """
+    Create an HTTP session for Xweather requests.
+    
+    With requests-cache installed this is a CachedSession backed by sqlite,
+    so responses survive process restarts for CACHE_TTL seconds. The
+    credentials are left out of cache keys and stored URLs.
+    
+    Returns:
+        A plain or cached requests session
+    """
+    if requests_cache is None:
+        return requests.Session()
+    
+    return requests_cache.CachedSession(
+        HTTP_CACHE_NAME,
+        backend='sqlite',
+        expire_after=CACHE_TTL,
+        allowable_methods=('GET',),
+        ignored_parameters=['client_id', 'client_secret']
+    )
+
 class XweatherClient:
     """
     Client for interacting with the Xweather API to fetch hyperlocal weather data.
     """
     
-    def __init__(self, client_id: str = None, client_secret: str = None):
+    def __init__(self, client_id: str = None, client_secret: str = None,
+                 session: Optional[requests.Session] = None):
         """
         Initialize the Xweather client.
         
         Args:
             client_id: Xweather client ID. If None, will use from config.
             client_secret: Xweather client secret. If None, will use from config.
+            session: Shared HTTP session to reuse pooled connections. If None,
+                the client creates and owns one via create_session, with retries.
         """
         self.client_id = client_id or XWEATHER_CLIENT_ID
         self.client_secret = client_secret or XWEATHER_CLIENT_SECRET
@@ -42,17 +117,32 @@ class XweatherClient:
         if not self.client_id or not self.client_secret:
             raise ValueError("Both Xweather client ID and client secret are required")
         
-        self.session = requests.Session()
-        retries = Retry(total=3, backoff_factor=1, status_forcelist=[502, 503, 504, 429])
-        adapter = HTTPAdapter(max_retries=retries)
-        self.session.mount('https://', adapter)
-        self.session.mount('http://', adapter)
+        self._owns_session = session is None
+        if session is None:
+            session = create_session()
+            retries = Retry(total=3, backoff_factor=1, status_forcelist=[502, 503, 504, 429])
+            # Non-blocking pool sized so concurrent fetches never wait on a connection
+            adapter = HTTPAdapter(max_retries=retries, pool_connections=HTTP_POOL_CONNECTIONS,
+                                  pool_maxsize=HTTP_POOL_MAXSIZE, pool_block=False)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+        
+        self.session = session
         self.session.headers.update({
             'User-Agent': 'HyperlocalWeatherMap/1.0'
         })
         
-        # Initialize cache
+        # Credentials merged into every request without touching caller params
+        self._auth = {'client_id': self.client_id, 'client_secret': self.client_secret}
+        
+        # Initialize cache (TTLCache is not thread-safe on its own)
         self.cache = TTLCache(maxsize=MAX_CACHE_SIZE, ttl=CACHE_TTL)
+        self._cache_lock = threading.Lock()
+    
+    def close(self) -> None:
+        """Close the HTTP session if this client created it."""
+        if self._owns_session:
+            self.session.close()
         
     def _make_request(self, endpoint: str, params: Dict) -> Dict:
         """
@@ -60,32 +150,31 @@ class XweatherClient:
         
         Args:
             endpoint: API endpoint URL
-            params: Request parameters
+            params: Request parameters, without credentials (not modified)
             
         Returns:
             JSON response data
         """
-        # Add API credentials to parameters
-        params['client_id'] = self.client_id
-        params['client_secret'] = self.client_secret
-        
-        # Create cache key
-        cache_key = f"{endpoint}_{hash(frozenset(params.items()))}"
+        # Credentials are constant per client, so the key covers the request params only
+        cache_key = (endpoint, tuple(sorted(params.items())))
         
         # Check cache first
-        if cache_key in self.cache:
+        with self._cache_lock:
+            cached = self.cache.get(cache_key)
+        if cached is not None:
             logger.info("Returning cached data")
-            return self.cache[cache_key]
+            return cached
         
         try:
             logger.info(f"Making request to {endpoint}")
-            response = self.session.get(endpoint, params=params, timeout=30)
+            response = self.session.get(endpoint, params={**self._auth, **params}, timeout=30)
             response.raise_for_status()
             
-            data = response.json()
+            data = orjson.loads(response.content) if orjson is not None else response.json()
             
             # Cache the response
-            self.cache[cache_key] = data
+            with self._cache_lock:
+                self.cache[cache_key] = data
             
             return data
             
@@ -105,10 +194,8 @@ class XweatherClient:
         Returns:
             DataFrame with observation data
         """
-        endpoint = f"{OBSERVATIONS_ENDPOINT}/{lat},{lon}"
+        endpoint = OBSERVATIONS_URL_FMT({'lat': lat, 'lon': lon})
         params = {
-            'client_id': self.client_id,
-            'client_secret': self.client_secret,
             'radius': f"{radius}km",
             'limit': 100
         }
@@ -124,30 +211,23 @@ class XweatherClient:
             logger.warning("No observations found")
             return pd.DataFrame()
         
-        # Extract relevant data
-        obs_data = []
-        for obs in observations:
-            obs_data.append({
-                'latitude': obs.get('loc', {}).get('lat'),
-                'longitude': obs.get('loc', {}).get('long'),
-                'station_id': obs.get('id'),
-                'name': obs.get('place', {}).get('name'),
-                'temperature': obs.get('ob', {}).get('tempF'),
-                'humidity': obs.get('ob', {}).get('humidity'),
-                'pressure': obs.get('ob', {}).get('pressureIN'),
-                'wind_speed': obs.get('ob', {}).get('windSpeedMPH'),
-                'wind_direction': obs.get('ob', {}).get('windDir'),
-                'weather': obs.get('ob', {}).get('weather'),
-                'timestamp': obs.get('ob', {}).get('dateTimeISO')
-            })
-        
-        df = pd.DataFrame(obs_data)
+        # Extract relevant data column by column
+        sections = {
+            section: [obs.get(section, {}) for obs in observations]
+            for section in ('loc', 'place', 'ob')
+        }
+        sections[None] = observations
+        
+        df = pd.DataFrame({
+            column: [record.get(key) for record in sections[section]]
+            for column, section, key in OBSERVATION_FIELDS
+        })
         
         # Convert to GeoDataFrame
         if not df.empty:
             gdf = gpd.GeoDataFrame(
                 df, 
-                geometry=gpd.points_from_xy(df.longitude, df.latitude),
+                geometry=_points(df),
                 crs='EPSG:4326'
             )
             return gdf
@@ -166,10 +246,8 @@ class XweatherClient:
         Returns:
             DataFrame with forecast data
         """
-        endpoint = f"{FORECAST_ENDPOINT}/{lat},{lon}"
+        endpoint = FORECAST_URL_FMT({'lat': lat, 'lon': lon})
         params = {
-            'client_id': self.client_id,
-            'client_secret': self.client_secret,
             'limit': days
         }
         
@@ -184,31 +262,18 @@ class XweatherClient:
             logger.warning("No forecast data found")
             return pd.DataFrame()
         
-        # Extract forecast data
-        forecast_data = []
-        for period in periods:
-            forecast_data.append({
-                'latitude': lat,
-                'longitude': lon,
-                'datetime': period.get('dateTimeISO'),
-                'temperature_max': period.get('maxTempF'),
-                'temperature_min': period.get('minTempF'),
-                'humidity': period.get('humidity'),
-                'pressure': period.get('pressureIN'),
-                'wind_speed': period.get('windSpeedMPH'),
-                'wind_direction': period.get('windDir'),
-                'weather': period.get('weather'),
-                'precip_probability': period.get('precipIN'),
-                'snow_probability': period.get('snowIN')
-            })
-        
-        df = pd.DataFrame(forecast_data)
+        # Extract forecast data column by column
+        columns = {'latitude': [lat] * len(periods), 'longitude': [lon] * len(periods)}
+        for column, key in FORECAST_FIELDS:
+            columns[column] = [period.get(key) for period in periods]
+        
+        df = pd.DataFrame(columns)
         
         # Convert to GeoDataFrame
         if not df.empty:
             gdf = gpd.GeoDataFrame(
                 df, 
-                geometry=gpd.points_from_xy(df.longitude, df.latitude),
+                geometry=_points(df),
                 crs='EPSG:4326'
             )
             return gdf
@@ -229,14 +294,21 @@ class XweatherClient:
         Returns:
             Tuple of (observations_df, forecast_df)
         """
+        # Snap to ~11 m so nearby lookups reuse the same cached responses
+        center_lat = round(center_lat, CACHE_COORD_DECIMALS)
+        center_lon = round(center_lon, CACHE_COORD_DECIMALS)
+        
         logger.info(f"Fetching hyperlocal data for {center_lat}, {center_lon}")
         
-        # Get observations
-        observations = self.get_observations(center_lat, center_lon, radius)
+        if not include_forecast:
+            return self.get_observations(center_lat, center_lon, radius), pd.DataFrame()
         
-        # Get forecast if requested
-        forecast = pd.DataFrame()
-        if include_forecast:
-            forecast = self.get_forecast(center_lat, center_lon)
+        # The two requests are independent, so overlap their round trips
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            observations_future = executor.submit(self.get_observations, center_lat, center_lon, radius)
+            forecast_future = executor.submit(self.get_forecast, center_lat, center_lon)
+            
+            observations = observations_future.result()
+            forecast = forecast_future.result()
         
         return observations, forecast